@@ -1,24 +1,42 @@
 import pandas as pd
 import re
+import io
+import csv
 from datetime import datetime
 import os
 
+_PAREN_RE = re.compile(r'\([^)]*\)')
+_SHEET_SANITIZE_RE = re.compile(r'[\[\]\:\*\?\/\\]')
+_FIELD_SEP_RE = re.compile(r'[ \t]*\t[ \t]*')
+
+def clean_sheet_name(block_name):
+    """Clean a block name for use as an Excel sheet name"""
+    # Excel forbids []:*?/\ in sheet names and limits them to 31 characters
+    return _SHEET_SANITIZE_RE.sub('', block_name)[:31]
+
 class MedicalDataParser:
-    def __init__(self, file_path):
-        self.file_path = file_path
+    __slots__ = ('file_path', 'blocks')
+    
+    def __init__(self, file_path_or_buffer):
+        # A path, raw bytes, or an already open text buffer
+        self.file_path = file_path_or_buffer
         self.blocks = {}
         
     def read_file(self):
-        """Read the entire file content"""
+        """Yield the file content line by line"""
+        if hasattr(self.file_path, 'read'):
+            yield from self.file_path
+            return
         try:
+            if isinstance(self.file_path, bytes):
+                yield from io.StringIO(self.file_path.decode('utf-8'))
+                return
             with open(self.file_path, 'r') as file:
-                return file.readlines()
+                yield from file
         except FileNotFoundError:
             print(f"Error: File '{self.file_path}' not found")
-            return []
         except Exception as e:
             print(f"Error reading file: {e}")
-            return []
 
     def is_header_line(self, line):
         """Check if line is a block header (contains asterisks)"""
@@ -30,42 +48,38 @@ class MedicalDataParser:
     
     def extract_block_name(self, line):
         """Extract the block name from header line"""
-        return re.sub(r'\*+', '', line).strip()
+        return line.strip().strip('*').strip()
     
     def parse_columns(self, line):
         """Parse column names from the format line"""
         # Remove parenthetical units and split
-        clean_line = re.sub(r'\([^)]*\)', '', line)
+        clean_line = _PAREN_RE.sub('', line)
         return [col.strip() for col in clean_line.split() if col.strip()]
     
-    def parse_data_line(self, line):
-        """Parse a data line into values"""
-        return [val.strip() for val in line.split('\t') if val.strip()]
-    
     def process_blocks(self):
         """Process the file and separate data into blocks"""
-        lines = self.read_file()
-        if not lines:
-            return
-        
         current_block = []
         current_block_name = None
         
-        for line in lines:
+        # Bind hot-loop lookups once rather than per line
+        is_header_line = self.is_header_line
+        append_line = current_block.append
+        
+        for line in self.read_file():
             line = line.strip()
             if not line:
                 continue
                 
-            if self.is_header_line(line):
+            if is_header_line(line):
                 # Process previous block if it exists
                 if current_block_name and current_block:
                     self.blocks[current_block_name] = self.create_dataframe(current_block)
                 
-                # Start new block
+                # Start new block, reusing the line buffer
                 current_block_name = self.extract_block_name(line)
-                current_block = []
+                current_block.clear()
             else:
-                current_block.append(line)
+                append_line(line)
         
         # Process the last block
         if current_block_name and current_block:
@@ -75,7 +89,7 @@ class MedicalDataParser:
         """Create a pandas DataFrame from block lines"""
         # Initialize variables
         columns = None
-        data = []
+        data_lines = []
         
         for line in block_lines:
             if self.is_format_line(line):
@@ -86,28 +100,44 @@ class MedicalDataParser:
                 columns = self.parse_columns(line)
             else:
                 # This is a data line
-                values = self.parse_data_line(line)
-                if values and len(values) == len(columns):
-                    data.append(values)
+                data_lines.append(line)
+        
+        if not columns or not data_lines:
+            return pd.DataFrame()
         
-        if not columns or not data:
+        # Collapse empty tab-separated fields, then keep only rows with one
+        # value per column
+        separators = len(columns) - 1
+        data = '\n'.join(
+            line for line in _FIELD_SEP_RE.sub('\t', '\n'.join(data_lines)).split('\n')
+            if line.count('\t') == separators
+        )
+        if not data:
             return pd.DataFrame()
         
-        # Create DataFrame
-        df = pd.DataFrame(data, columns=columns)
+        # Let the C parser tokenize the tab-separated rows and infer numeric
+        # dtypes in one pass; '-' marks a missing value and quotes are literal
+        df = pd.read_csv(
+            io.StringIO(data),
+            sep='\t',
+            header=None,
+            index_col=False,
+            na_values=['-'],
+            quoting=csv.QUOTE_NONE,
+            engine='c'
+        )
+        # Assign names afterwards since read_csv rejects duplicate names
+        df.columns = columns
         
-        # Convert Time column to datetime if it exists
+        # Convert Time column to datetime if it exists; repeated timestamps
+        # are parsed once and unparseable values become NaT
         if 'Time' in df.columns:
-            try:
-                df['Time'] = pd.to_datetime(df['Time'], format='%d/%m/%Y %H:%M')
-            except ValueError as e:
-                print(f"Error converting time values: {e}")
-                print("Time column left as string")
-        
-        # Convert numeric columns
-        for col in df.columns:
-            if col != 'Time':
-                df[col] = pd.to_numeric(df[col].replace('-', pd.NA), errors='ignore')
+            df['Time'] = pd.to_datetime(
+                df['Time'],
+                format='%d/%m/%Y %H:%M',
+                cache=True,
+                errors='coerce'
+            )
         
         return df
     
@@ -141,11 +171,11 @@ class MedicalDataParser:
             
             try:
                 # Create Excel writer object
-                with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+                with pd.ExcelWriter(filename, engine='xlsxwriter') as writer:
                     # Write each block to a separate sheet
                     for block_name, df in self.blocks.items():
                         # Clean sheet name (Excel has restrictions on sheet names)
-                        sheet_name = re.sub(r'[\[\]\:\*\?\/\\]', '', block_name)[:31]
+                        sheet_name = clean_sheet_name(block_name)
                         
                         # Write DataFrame to Excel sheet
                         df.to_excel(writer, sheet_name=sheet_name, index=False)
@@ -154,10 +184,10 @@ class MedicalDataParser:
                         worksheet = writer.sheets[sheet_name]
                         for idx, col in enumerate(df.columns):
                             max_length = max(
-                                df[col].astype(str).apply(len).max(),
+                                df[col].astype(str).str.len().max() if len(df) else 0,
                                 len(str(col))
                             ) + 2
-                            worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)
+                            worksheet.set_column(idx, idx, min(max_length, 50))
                 
                 print(f"\nData successfully exported to '{filename}'")
                 print(f"Number of sheets created: {len(self.blocks)}")
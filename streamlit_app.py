@@ -4,89 +4,100 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime
 import io
-from medical_data_parser import MedicalDataParser  # Import your existing parser
+from medical_data_parser import MedicalDataParser, clean_sheet_name  # Import your existing parser
+
+@st.cache_data(show_spinner=False)
+def load_blocks(file_bytes):
+    """Parse uploaded file content into blocks, cached across reruns"""
+    # Process uploaded content in memory with existing parser
+    parser = MedicalDataParser(file_bytes)
+    parser.process_blocks()
+    return parser.blocks
 
 def create_plot(blocks):
     """Create time series plot with all specified elements"""
     # Create figure with secondary y-axis
     fig = make_subplots(specs=[[{"secondary_y": True}]])
     
+    # Collect traces and their target y-axes, then add them in one call
+    traces = []
+    secondary_ys = []
+    
     # Process glucose data
     glucose_df = blocks.get('Glucose_concentration', pd.DataFrame())
     if not glucose_df.empty:
-        # Split glucose values into in-range and out-of-range
-        in_range = glucose_df[
-            (glucose_df['conc'] >= 3.9) & 
-            (glucose_df['conc'] <= 10.0)
-        ]
-        out_range = glucose_df[
-            (glucose_df['conc'] < 3.9) | 
-            (glucose_df['conc'] > 10.0)
-        ]
+        # Split glucose values into in-range and out-of-range with one mask
+        conc = glucose_df['conc'].to_numpy()
+        in_range_mask = (conc >= 3.9) & (conc <= 10.0)
+        in_range = glucose_df[in_range_mask]
+        out_range = glucose_df[~in_range_mask]
         
         # Add in-range glucose values (filled circles)
-        fig.add_trace(
+        traces.append(
             go.Scatter(
                 x=in_range['Time'],
                 y=in_range['conc'],
                 mode='markers',
                 name='Glucose (In Range)',
                 marker=dict(size=8, color='blue', symbol='circle'),
-            ),
-            secondary_y=True
+            )
         )
+        secondary_ys.append(True)
         
         # Add out-of-range glucose values (empty circles)
-        fig.add_trace(
+        traces.append(
             go.Scatter(
                 x=out_range['Time'],
                 y=out_range['conc'],
                 mode='markers',
                 name='Glucose (Out of Range)',
                 marker=dict(size=8, color='blue', symbol='circle-open'),
-            ),
-            secondary_y=True
+            )
         )
+        secondary_ys.append(True)
     
     # Add insulin infusion as continuous line
     infusion_df = blocks.get('Insulin_infusion', pd.DataFrame())
     if not infusion_df.empty:
-        fig.add_trace(
+        traces.append(
             go.Scatter(
                 x=infusion_df['Time'],
                 y=infusion_df['Rate'],
                 mode='lines',
                 name='Insulin Infusion',
                 line=dict(color='blue'),
-            ),
-            secondary_y=False
+            )
+        )
+        secondary_ys.append(False)
+    
+    if traces:
+        fig.add_traces(
+            traces,
+            rows=[1] * len(traces),
+            cols=[1] * len(traces),
+            secondary_ys=secondary_ys
         )
     
+    # Build meal and bolus labels in one pass instead of per-row annotations
+    annotations = []
+    
     # Add meal data as labels on top
     meal_df = blocks.get('Meal', pd.DataFrame())
     if not meal_df.empty:
-        for _, row in meal_df.iterrows():
-            fig.add_annotation(
-                x=row['Time'],
-                y=1.1,
-                text=f"Meal: {row['CHO']}g",
-                showarrow=True,
-                arrowhead=2,
-                yref="paper"
-            )
+        annotations.extend(
+            dict(x=t, y=1.1, text=f"Meal: {cho}g",
+                 showarrow=True, arrowhead=2, yref="paper")
+            for t, cho in zip(meal_df['Time'], meal_df['CHO'])
+        )
     
     # Add insulin bolus as labels
     bolus_df = blocks.get('Insulin_bolus', pd.DataFrame())
     if not bolus_df.empty:
-        for _, row in bolus_df.iterrows():
-            fig.add_annotation(
-                x=row['Time'],
-                y=1.05,
-                text=f"Bolus: {row['Bolus']}U",
-                showarrow=True,
-                arrowhead=2,
-                yref="paper"
-            )
+        annotations.extend(
+            dict(x=t, y=1.05, text=f"Bolus: {bolus}U",
+                 showarrow=True, arrowhead=2, yref="paper")
+            for t, bolus in zip(bolus_df['Time'], bolus_df['Bolus'])
+        )
     
     # Update layout
     fig.update_layout(
@@ -99,7 +110,8 @@ def create_plot(blocks):
         ),
         height=800,
         showlegend=True,
-        margin=dict(t=150)  # Extra margin for annotations
+        margin=dict(t=150),  # Extra margin for annotations
+        annotations=list(fig.layout.annotations) + annotations
     )
     
     # Update y-axes
@@ -126,17 +138,11 @@ def main():
     )
     
     if uploaded_file is not None:
-        # Save uploaded file temporarily
-        with open("temp_file.txt", "wb") as f:
-            f.write(uploaded_file.getvalue())
-        
-        # Process file with existing parser
-        parser = MedicalDataParser("temp_file.txt")
-        parser.process_blocks()
+        blocks = load_blocks(uploaded_file.getvalue())
         
         # Show data summary
         st.subheader("Data Summary")
-        for name, df in parser.blocks.items():
+        for name, df in blocks.items():
             with st.expander(f"Block: {name}"):
                 st.write(f"Number of rows: {len(df)}")
                 st.write(f"Number of columns: {len(df.columns)}")
@@ -144,16 +150,16 @@ def main():
         
         # Create and display plot
         st.subheader("Time Series Visualization")
-        fig = create_plot(parser.blocks)
+        fig = create_plot(blocks)
         st.plotly_chart(fig, use_container_width=True)
         
         # Export to Excel
         if st.button("Export to Excel"):
             # Create Excel file in memory
             output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                for block_name, df in parser.blocks.items():
-                    df.to_excel(writer, sheet_name=block_name, index=False)
+            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+                for block_name, df in blocks.items():
+                    df.to_excel(writer, sheet_name=clean_sheet_name(block_name), index=False)
             
             # Prepare download button
             st.download_button(